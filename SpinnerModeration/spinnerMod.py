@@ -1,13 +1,19 @@
 import discord
-from discord import ui
+from discord import ui, app_commands
 from redbot.core import commands, Config, checks
 from redbot.core.utils.chat_formatting import humanize_timedelta, pagify, box
 from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 import logging
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, Union, Any, Awaitable, Callable, Iterable
 import asyncio
 import time
 import re
+import math
+import shlex
+import difflib
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
 from datetime import timedelta
 
 log = logging.getLogger("red.spinnerModeration")
@@ -22,6 +28,101 @@ ACTION_COLORS = {
     "purge": discord.Color.blue(),
 }
 
+# Upper bound on how long a pre-action DM may hold up a kick/ban.
+DM_NOTIFY_TIMEOUT = 2.0
+
+# Discord caps autocomplete responses at 25 choices of up to 100 characters.
+AUTOCOMPLETE_LIMIT = 25
+
+class ReasonIndex:
+    """Case-insensitive prefix index over a guild's warn reason names.
+
+    Keys are kept in a sorted array so a prefix lookup is a bisect plus a
+    short scan. Queries with no prefix hit fall back to fuzzy matching.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.entries = sorted((name.casefold(), name) for name in names)
+        self.keys = [key for key, _ in self.entries]
+        self.by_key: Dict[str, List[str]] = {}
+        for key, name in self.entries:
+            self.by_key.setdefault(key, []).append(name)
+
+    def search(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[str]:
+        query = query.strip().casefold()
+        if not query:
+            return [name for _, name in self.entries[:limit]]
+        results = []
+        for key, name in self.entries[bisect_left(self.keys, query):]:
+            if not key.startswith(query) or len(results) >= limit:
+                break
+            results.append(name)
+        if results:
+            return results
+        for key in difflib.get_close_matches(query, self.by_key, n=limit, cutoff=0.5):
+            results.extend(self.by_key[key])
+        if len(results) < limit:
+            seen = set(results)
+            results.extend(name for key, name in self.entries if query in key and name not in seen)
+        return results[:limit]
+
+def load_warning_columns(all_members: Dict[int, dict], overrides: Dict[str, int]):
+    """Flatten every member's warnings into parallel arrays.
+
+    Rows are grouped by member and sorted by date within each member;
+    ``offsets[m]:offsets[m + 1]`` is the row range of ``member_ids[m]``.
+    Points are taken from ``overrides`` when the warning's reason is listed.
+    """
+    member_ids = array("q")
+    offsets = array("q", [0])
+    dates = array("d")
+    points = array("q")
+    expires = array("d")
+    for member_id, data in all_members.items():
+        warnings = sorted(data.get("warnings", []), key=lambda w: w["date"])
+        if not warnings:
+            continue
+        member_ids.append(int(member_id))
+        for w in warnings:
+            dates.append(w["date"])
+            points.append(overrides.get(w["reason"], w["points"]))
+            expires.append(math.inf if w["permanent"] or not w.get("expires") else w["expires"])
+        offsets.append(len(dates))
+    return member_ids, offsets, dates, points, expires
+
+def replay_ladder(columns, ladder: List[dict]) -> List[List[int]]:
+    """Replay warning columns against a ladder sorted by ascending points.
+
+    Returns, per tier, the IDs of members who would have triggered it at
+    least once. A member's replay stops at their first ban.
+    """
+    member_ids, offsets, dates, points, expires = columns
+    thresholds = [p["points"] for p in ladder]
+    hits = [[] for _ in ladder]
+    for m, member_id in enumerate(member_ids):
+        active = 0
+        pending = []
+        triggered = set()
+        for i in range(offsets[m], offsets[m + 1]):
+            now = dates[i]
+            while pending and pending[0][0] <= now:
+                active -= heappop(pending)[1]
+            active += points[i]
+            if expires[i] != math.inf:
+                heappush(pending, (expires[i], points[i]))
+            tier = bisect_right(thresholds, active) - 1
+            if tier >= 0:
+                triggered.add(tier)
+                if ladder[tier]["action"] == "ban":
+                    break
+        for tier in triggered:
+            hits[tier].append(member_id)
+    return hits
+
+def simulate_punishments(all_members: Dict[int, dict], ladder: List[dict], overrides: Dict[str, int]):
+    columns = load_warning_columns(all_members, overrides)
+    return len(columns[0]), len(columns[2]), replay_ladder(columns, ladder)
+
 def is_mod_or_admin():
     async def predicate(ctx):
         if not ctx.guild:
@@ -76,6 +177,8 @@ class SpinnerModeration(commands.Cog):
         self.config.register_guild(**default_guild)
         default_member = {"warnings": []}
         self.config.register_member(**default_member)
+        # guild_id -> ReasonIndex, built lazily and refreshed on reason add/remove.
+        self.reason_index: Dict[int, ReasonIndex] = {}
 
     async def cog_load(self):
         log.info("SpinnerModeration cog loaded.")
@@ -113,8 +216,9 @@ class SpinnerModeration(commands.Cog):
         async with self.config.member(member).warnings() as warnings:
             warnings[:] = [w for w in warnings if w["permanent"] or w["expires"] > current_time]
 
-    async def apply_auto_punishment(self, ctx: commands.Context, member: discord.Member):
-        points = await self.get_points(member)
+    async def apply_auto_punishment(self, ctx: commands.Context, member: discord.Member, points: Optional[int] = None):
+        if points is None:
+            points = await self.get_points(member)
         punishments = await self.config.guild(ctx.guild).punishments()
         if not punishments:
             return
@@ -171,36 +275,105 @@ class SpinnerModeration(commands.Cog):
         except discord.HTTPException as e:
             log.error(f"Failed to DM user {user.id}: {e}")
 
-def parse_duration(self, duration_str: str) -> Optional[int]:
-    if not duration_str:
-        return None
-    # Remove extra whitespace and convert to lowercase
-    duration_str = duration_str.strip().lower()
-    if not duration_str:
-        return None
-    total_seconds = 0
-    # Match numbers followed by s, m, h, d, or w
-    matches = re.findall(r"(\d+)\s*([smhdw])", duration_str)
-    if not matches:
-        log.debug(f"No valid duration matches found for input: '{duration_str}'")
-        return None
-    for value, unit in matches:
-        try:
-            value = int(value)
-        except ValueError:
-            log.debug(f"Invalid number in duration: {value}")
+    async def notify_before_removal(self, member: discord.Member, action: str, reason: str):
+        total_points = await self.get_points(member)
+        await self.send_dm_notification(member, member.guild, action, reason, total_points)
+
+    async def run_action(
+        self,
+        ctx: commands.Context,
+        action: str,
+        commit: Callable[[], Awaitable[Any]],
+        *,
+        notify: Optional[Callable[[], Awaitable[Any]]] = None,
+        effects: Iterable[Callable[[Any], Awaitable[Any]]] = (),
+        after: Optional[Callable[[Any], Awaitable[Any]]] = None,
+    ) -> Any:
+        """Shared pipeline for moderation actions.
+
+        Defers the interaction, runs the optional pre-action DM (which must land
+        before a member loses access to the guild), commits the state change,
+        then runs the DM/modlog/reply side effects concurrently. ``after`` runs
+        once the side effects are done. Errors raised by ``commit`` propagate;
+        errors in side effects are logged. Returns the commit result.
+        """
+        timings = {}
+        start = last = time.perf_counter()
+
+        def mark(stage: str):
+            nonlocal last
+            now = time.perf_counter()
+            timings[stage] = now - last
+            last = now
+
+        await ctx.defer()
+        mark("defer")
+        if notify is not None:
+            try:
+                await asyncio.wait_for(notify(), timeout=DM_NOTIFY_TIMEOUT)
+            except asyncio.TimeoutError:
+                log.warning(f"DM notification for {action} timed out; continuing.")
+            mark("notify")
+        result = await commit()
+        mark("commit")
+        outcomes = await asyncio.gather(*(effect(result) for effect in effects), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                log.error(f"Side effect of {action} failed: {outcome}", exc_info=outcome)
+        mark("effects")
+        if after is not None:
+            await after(result)
+            mark("after")
+        timings["total"] = time.perf_counter() - start
+        log.debug(
+            f"{action} pipeline timings: "
+            + ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items())
+        )
+        return result
+
+    async def get_reason_index(self, guild: discord.Guild) -> ReasonIndex:
+        index = self.reason_index.get(guild.id)
+        if index is None:
+            reasons = await self.config.guild(guild).warn_reasons()
+            index = self.reason_index[guild.id] = ReasonIndex(reasons)
+        return index
+
+    async def reason_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        if not interaction.guild:
+            return []
+        index = await self.get_reason_index(interaction.guild)
+        return [app_commands.Choice(name=name[:100], value=name[:100]) for name in index.search(current)]
+
+    def parse_duration(self, duration_str: str) -> Optional[int]:
+        if not duration_str:
+            return None
+        # Remove extra whitespace and convert to lowercase
+        duration_str = duration_str.strip().lower()
+        if not duration_str:
+            return None
+        total_seconds = 0
+        # Match numbers followed by s, m, h, d, or w
+        matches = re.findall(r"(\d+)\s*([smhdw])", duration_str)
+        if not matches:
+            log.debug(f"No valid duration matches found for input: '{duration_str}'")
             return None
-        if unit == "s":
-            total_seconds += value
-        elif unit == "m":
-            total_seconds += value * 60
-        elif unit == "h":
-            total_seconds += value * 3600
-        elif unit == "d":
-            total_seconds += value * 86400
-        elif unit == "w":
-            total_seconds += value * 604800
-    return total_seconds
+        for value, unit in matches:
+            try:
+                value = int(value)
+            except ValueError:
+                log.debug(f"Invalid number in duration: {value}")
+                return None
+            if unit == "s":
+                total_seconds += value
+            elif unit == "m":
+                total_seconds += value * 60
+            elif unit == "h":
+                total_seconds += value * 3600
+            elif unit == "d":
+                total_seconds += value * 86400
+            elif unit == "w":
+                total_seconds += value * 604800
+        return total_seconds
 
     async def mute_member(self, guild: discord.Guild, member: discord.Member, duration_seconds: Optional[int], reason: str):
         mute_role_id = await self.config.guild(guild).mute_role()
@@ -267,14 +440,32 @@ def parse_duration(self, duration_str: str) -> Optional[int]:
             "moderator": ctx.author.id,
             "date": int(time.time())
         }
-        async with self.config.member(member).warnings() as warnings:
-            warnings.append(warning)
-        total_points = await self.get_points(member)
         duration_str = humanize_timedelta(timedelta=timedelta(seconds=duration_seconds)) if duration_seconds else "Permanent"
-        await self.send_dm_notification(member, ctx.guild, "warning", reason, total_points, duration_str)
-        await self.log_action(ctx.guild, "warn", member, ctx.author, reason, total_points, duration_str)
-        await ctx.send(f"{member.mention} has been warned for: {reason}. Total points: {total_points}.")
-        await self.apply_auto_punishment(ctx, member)
+
+        async def commit():
+            # Prune expired entries, append and total up in a single write.
+            now = time.time()
+            async with self.config.member(member).warnings() as warnings:
+                warnings[:] = [w for w in warnings if w["permanent"] or w["expires"] > now]
+                warnings.append(warning)
+                return sum(w["points"] for w in warnings)
+
+        await self.run_action(
+            ctx,
+            "warn",
+            commit,
+            effects=[
+                lambda total: self.send_dm_notification(member, ctx.guild, "warning", reason, total, duration_str),
+                lambda total: self.log_action(ctx.guild, "warn", member, ctx.author, reason, total, duration_str),
+                lambda total: ctx.send(f"{member.mention} has been warned for: {reason}. Total points: {total}."),
+            ],
+            # Runs after the DM so a kick/ban doesn't cut the member off first.
+            after=lambda total: self.apply_auto_punishment(ctx, member, total),
+        )
+
+    @warn.autocomplete("reason")
+    async def warn_reason_autocomplete(self, interaction: discord.Interaction, current: str):
+        return await self.reason_autocomplete(interaction, current)
 
     @commands.hybrid_command(name="warnings")
     @commands.guild_only()
@@ -352,6 +543,7 @@ def parse_duration(self, duration_str: str) -> Optional[int]:
                 "permanent": permanent,
                 "duration": duration_seconds
             }
+            self.reason_index[ctx.guild.id] = ReasonIndex(reasons)
         await ctx.send(f"Reason '{name}' added/updated.")
 
     @reason_group.command(name="remove")
@@ -360,10 +552,15 @@ def parse_duration(self, duration_str: str) -> Optional[int]:
         async with self.config.guild(ctx.guild).warn_reasons() as reasons:
             if name in reasons:
                 del reasons[name]
+                self.reason_index[ctx.guild.id] = ReasonIndex(reasons)
                 await ctx.send(f"Reason '{name}' removed.")
             else:
                 await ctx.send(f"Reason '{name}' not found.")
 
+    @reason_remove.autocomplete("name")
+    async def reason_remove_autocomplete(self, interaction: discord.Interaction, current: str):
+        return await self.reason_autocomplete(interaction, current)
+
     @reason_group.command(name="list")
     async def reason_list(self, ctx: commands.Context):
         """List all warn reasons."""
@@ -416,6 +613,60 @@ def parse_duration(self, duration_str: str) -> Optional[int]:
             pun[:] = [p for p in pun if p["points"] != points]
         await ctx.send(f"Punishment for {points} points removed.")
 
+    @punishments_group.command(name="simulate")
+    async def punishments_simulate(self, ctx: commands.Context, *, ladder: Optional[str] = None):
+        """Replay stored warnings against a proposed punishment ladder.
+
+        Usage: [p]punishments simulate [points:action[:duration] ...] ["reason=points" ...]
+        Without tiers the current ladder is used. Only warnings still stored are replayed.
+        """
+        tiers = []
+        overrides = {}
+        try:
+            tokens = shlex.split(ladder) if ladder else []
+        except ValueError:
+            return await ctx.send("Invalid ladder. Check your quotes.")
+        for token in tokens:
+            if "=" in token:
+                name, _, value = token.rpartition("=")
+                try:
+                    overrides[name] = int(value)
+                except ValueError:
+                    return await ctx.send(f"Invalid points in reason override `{token}`.")
+                continue
+            parts = token.split(":")
+            if len(parts) not in (2, 3) or not parts[0].isdigit() or parts[1].lower() not in ["mute", "kick", "ban", "warn"]:
+                return await ctx.send(f"Invalid tier `{token}`. Use `points:action[:duration]`.")
+            duration_seconds = self.parse_duration(parts[2]) if len(parts) == 3 else None
+            tiers = [t for t in tiers if t["points"] != int(parts[0])]
+            tiers.append({"points": int(parts[0]), "action": parts[1].lower(), "duration": duration_seconds})
+        if not tiers:
+            tiers = await self.config.guild(ctx.guild).punishments()
+        if not tiers:
+            return await ctx.send("No punishments configured or provided.")
+        tiers = sorted(tiers, key=lambda p: p["points"])
+        await ctx.defer()
+        started = time.perf_counter()
+        all_members = await self.config.all_members(ctx.guild)
+        loop = asyncio.get_running_loop()
+        member_count, warning_count, hits = await loop.run_in_executor(
+            None, simulate_punishments, all_members, tiers, overrides
+        )
+        elapsed = time.perf_counter() - started
+        embed = discord.Embed(title="Punishment Simulation", color=discord.Color.blurple())
+        embed.description = f"Replayed {warning_count} warnings for {member_count} members in {elapsed:.2f}s."
+        if overrides:
+            embed.description += "\nReason overrides: " + ", ".join(f"{name}={pts}" for name, pts in overrides.items())
+        for p, members in zip(tiers, hits):
+            duration = humanize_timedelta(timedelta=timedelta(seconds=p["duration"])) if p.get("duration") else "Permanent"
+            sample = ", ".join(f"<@{member_id}>" for member_id in members[:5]) or "None"
+            embed.add_field(
+                name=f"{p['points']} points: {p['action'].capitalize()} ({duration})",
+                value=f"{len(members)} members\nSample: {sample}",
+                inline=False,
+            )
+        await ctx.send(embed=embed)
+
     @punishments_group.command(name="gui")
     async def punishments_gui(self, ctx: commands.Context):
         """Opens an interactive GUI for managing punishments."""
@@ -430,32 +681,53 @@ def parse_duration(self, duration_str: str) -> Optional[int]:
         """Mutes a member with optional duration."""
         duration_seconds = self.parse_duration(duration)
         duration_str = humanize_timedelta(timedelta=timedelta(seconds=duration_seconds)) if duration_seconds else "Permanent"
-        await self.mute_member(ctx.guild, member, duration_seconds, reason)
-        total_points = await self.get_points(member)
-        await self.send_dm_notification(member, ctx.guild, "mute", reason, total_points, duration_str)
-        await ctx.send(f"{member.mention} has been muted. Duration: {duration_str}.")
-        await self.log_action(ctx.guild, "mute", member, ctx.author, reason, duration=duration_str)
+
+        async def notify_dm(_):
+            total_points = await self.get_points(member)
+            await self.send_dm_notification(member, ctx.guild, "mute", reason, total_points, duration_str)
+
+        await self.run_action(
+            ctx,
+            "mute",
+            lambda: self.mute_member(ctx.guild, member, duration_seconds, reason),
+            effects=[
+                notify_dm,
+                lambda _: ctx.send(f"{member.mention} has been muted. Duration: {duration_str}."),
+                lambda _: self.log_action(ctx.guild, "mute", member, ctx.author, reason, duration=duration_str),
+            ],
+        )
 
     @commands.hybrid_command(name="unmute")
     @commands.guild_only()
     @is_mod_or_admin()
     async def unmute(self, ctx: commands.Context, member: discord.Member):
         """Unmutes a member."""
-        await self.unmute_member(ctx.guild, member, "Unmuted by moderator.")
-        await ctx.send(f"{member.mention} has been unmuted.")
-        await self.log_action(ctx.guild, "unmute", member, ctx.author, "Unmuted")
+        await self.run_action(
+            ctx,
+            "unmute",
+            lambda: self.unmute_member(ctx.guild, member, "Unmuted by moderator."),
+            effects=[
+                lambda _: ctx.send(f"{member.mention} has been unmuted."),
+                lambda _: self.log_action(ctx.guild, "unmute", member, ctx.author, "Unmuted"),
+            ],
+        )
 
     @commands.hybrid_command(name="kick")
     @commands.guild_only()
     @is_mod_or_admin()
     async def kick(self, ctx: commands.Context, member: discord.Member, *, reason: str = "No reason provided"):
         """Kicks a member."""
-        total_points = await self.get_points(member)
-        await self.send_dm_notification(member, ctx.guild, "kick", reason, total_points)
         try:
-            await member.kick(reason=reason)
-            await ctx.send(f"{member} has been kicked.")
-            await self.log_action(ctx.guild, "kick", member, ctx.author, reason)
+            await self.run_action(
+                ctx,
+                "kick",
+                lambda: member.kick(reason=reason),
+                notify=lambda: self.notify_before_removal(member, "kick", reason),
+                effects=[
+                    lambda _: ctx.send(f"{member} has been kicked."),
+                    lambda _: self.log_action(ctx.guild, "kick", member, ctx.author, reason),
+                ],
+            )
         except discord.Forbidden:
             await ctx.send("Missing permissions to kick.")
 
@@ -464,12 +736,17 @@ def parse_duration(self, duration_str: str) -> Optional[int]:
     @is_mod_or_admin()
     async def ban(self, ctx: commands.Context, member: discord.Member, *, reason: str = "No reason provided"):
         """Bans a member."""
-        total_points = await self.get_points(member)
-        await self.send_dm_notification(member, ctx.guild, "ban", reason, total_points)
         try:
-            await member.ban(reason=reason)
-            await ctx.send(f"{member} has been banned.")
-            await self.log_action(ctx.guild, "ban", member, ctx.author, reason)
+            await self.run_action(
+                ctx,
+                "ban",
+                lambda: member.ban(reason=reason),
+                notify=lambda: self.notify_before_removal(member, "ban", reason),
+                effects=[
+                    lambda _: ctx.send(f"{member} has been banned."),
+                    lambda _: self.log_action(ctx.guild, "ban", member, ctx.author, reason),
+                ],
+            )
         except discord.Forbidden:
             await ctx.send("Missing permissions to ban.")
 